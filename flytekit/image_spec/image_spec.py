@@ -208,9 +208,10 @@ class ImageSpec:
             spec = dataclasses.replace(spec, source_root=ls_digest)
 
         if self.copy:
-            from flytekit.tools.fast_registration import compute_digest
+            from flytekit.tools.fast_registration import _compute_legacy_digest
 
-            digest = compute_digest(self.copy, None)
+            # Keep the digest that tags have always been computed with, so that existing images are not rebuilt
+            digest = _compute_legacy_digest(self.copy)
             spec = dataclasses.replace(spec, copy=digest)
 
         if spec.requirements:
@@ -0,0 +1,15 @@
+import os
+from typing import Optional
+
+
+def _relative_path(path: str, root: str, prefix: Optional[str] = None) -> str:
+    """
+    Returns path relative to root like os.path.relpath, but by slicing off root if path starts with it, which is the
+    case for paths that were found by walking root. This is much faster than os.path.relpath, which normalizes both.
+    :param str prefix: root with a trailing separator, can be passed to avoid computing it for every path
+    """
+    if prefix is None:
+        prefix = os.path.join(root, "")
+    if path.startswith(prefix):
+        return path[len(prefix) :]
+    return os.path.relpath(path, root)
@@ -1,21 +1,32 @@
 from __future__ import annotations
 
+import contextlib
+import copy
+import functools
 import gzip
 import hashlib
+import io
 import os
 import pathlib
 import posixpath
 import shutil
+import sqlite3
 import stat
+import struct
 import subprocess
+import sys
 import tarfile
 import tempfile
+import threading
 import time
 import typing
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Optional, Union
 
 import click
+from diskcache import Cache, Timeout
 from rich import print as rich_print
 from rich.progress import (
     BarColumn,
@@ -31,11 +42,39 @@ from flytekit.core.python_auto_container import PICKLE_FILE_PATH
 from flytekit.core.utils import timeit
 from flytekit.exceptions.user import FlyteDataNotFoundException
 from flytekit.loggers import is_display_progress_enabled, logger
+from flytekit.tools._paths import _relative_path
 from flytekit.tools.ignore import DockerIgnore, FlyteIgnore, GitIgnore, Ignore, IgnoreGroup, StandardIgnore
-from flytekit.tools.script_mode import _filehash_update, _pathhash_update, ls_files, tar_strip_file_attributes
+from flytekit.tools.script_mode import (
+    _filehash_update,
+    _pathhash_update,
+    ls_files,
+    tar_strip_file_attributes,
+)
 
 FAST_PREFIX = "fast"
 FAST_FILEENDING = ".tar.gz"
+# File endings of the code tarball by compression
+FAST_FILEENDINGS = {"gz": FAST_FILEENDING, "zst": ".tar.zst", "none": ".tar"}
+# tarfile copies file contents and flushes its stream in 16KiB and 10KiB chunks by default, use larger buffers to
+# reduce the number of read/write calls when packaging large files
+TAR_BUFSIZE = 2 * 1024 * 1024
+# Size of the buffer in front of the compressed output, so that it is written to disk in large, bounded chunks
+OUTPUT_BUFSIZE = 4 * 1024 * 1024
+# Size of the chunks passed to the sink of fast_package, which is the minimum part size of S3 multipart uploads
+SINK_CHUNK_SIZE = 8 * 1024 * 1024
+# Like shutil, only use os.sendfile on Linux, where it can write to any kind of file descriptor
+_USE_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+# Location on the filesystem where file digests are cached between invocations of compute_digest
+DIGEST_CACHE_LOCATION = "~/.flyte/digest-cache"
+DIGEST_CACHE_SIZE_LIMIT = 64 * 1024 * 1024
+# Seconds to wait for the digest cache while another process holds its lock, before hashing without it
+DIGEST_CACHE_TIMEOUT = 1
+# Files smaller than this are hashed faster than they are looked up in the digest cache, so are fed directly into the
+# digest instead
+DIGEST_CACHE_MIN_FILE_SIZE = 64 * 1024
+# Files modified within this window may change again without a visible change of their mtime, so are not cached
+DIGEST_CACHE_RACY_WINDOW_NS = 2 * 10**9
 
 
 @dataclass(frozen=True)
@@ -48,6 +87,8 @@ class FastPackageOptions:
     keep_default_ignores: bool = True
     copy_style: Optional[CopyFileDetection] = None
     show_files: bool = False
+    compress_program: Optional[str] = None
+    compression: typing.Literal["gz", "zst", "none"] = "gz"
 
 
 def print_ls_tree(source: os.PathLike, ls: typing.List[str]):
@@ -76,24 +117,247 @@ def print_ls_tree(source: os.PathLike, ls: typing.List[str]):
     rich_print(tree_root)
 
 
-def compress_tarball(source: os.PathLike, output: os.PathLike) -> None:
-    """Compress code tarball using pigz if available, otherwise gzip"""
-    if pigz := shutil.which("pigz"):
-        with open(output, "wb") as gzipped:
-            subprocess.run([pigz, "--no-time", "-c", source], stdout=gzipped, check=True)
-    else:
-        start_time = time.time()
-        with gzip.GzipFile(filename=output, mode="wb", mtime=0) as gzipped:
-            with open(source, "rb") as source_file:
-                gzipped.write(source_file.read())
-
-        end_time = time.time()
-        warning_time = 10
-        if end_time - start_time > warning_time:
-            click.secho(
-                f"Code tarball compression took {end_time - start_time:.0f} seconds. Consider installing `pigz` for faster compression.",
-                fg="yellow",
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstandard must be installed to use zstd compressed code tarballs") from e
+    return zstandard
+
+
+class _SinkWriter:
+    """
+    Writes to a file and passes everything written to a sink as well, in chunks of SINK_CHUNK_SIZE bytes except for
+    the last one. This allows e.g. uploading the file while it is being written.
+    """
+
+    def __init__(self, fileobj: typing.BinaryIO, sink: typing.Callable[[bytes], None]):
+        self._fileobj = fileobj
+        self._sink = sink
+        self._chunk = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._fileobj.write(data)
+        self._chunk += data
+        while len(self._chunk) >= SINK_CHUNK_SIZE:
+            self._sink(bytes(self._chunk[:SINK_CHUNK_SIZE]))
+            del self._chunk[:SINK_CHUNK_SIZE]
+        return len(data)
+
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+    def close(self) -> None:
+        """Passes the remaining data to the sink. The file is not closed."""
+        if self._chunk:
+            self._sink(bytes(self._chunk))
+            self._chunk.clear()
+
+
+@contextlib.contextmanager
+def _open_output(
+    output: os.PathLike, sink: Optional[typing.Callable[[bytes], None]] = None
+) -> typing.Iterator[typing.BinaryIO]:
+    """
+    Opens output for writing with an OUTPUT_BUFSIZE buffer instead of the default 8 KiB one. If a sink is given,
+    everything written is passed to it as well. The data is written to a temporary file next to output, which only
+    replaces output once everything was written, so that a failure never leaves a truncated file behind at output.
+    """
+    tmp_output = f"{os.fspath(output)}.{uuid.uuid4().hex}.tmp"
+    try:
+        with io.BufferedWriter(open(tmp_output, "xb", buffering=0), buffer_size=OUTPUT_BUFSIZE) as f:
+            if sink is None:
+                yield f
+            else:
+                writer = _SinkWriter(f, sink)
+                yield writer
+                writer.close()
+        os.replace(tmp_output, output)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_output)
+        raise
+
+
+def _pump(src: typing.BinaryIO, dst: typing.BinaryIO, errors: List[BaseException]) -> None:
+    """Copies src to dst until src is exhausted, collecting errors instead of raising them."""
+    try:
+        shutil.copyfileobj(src, dst, SINK_CHUNK_SIZE)
+    except BaseException as e:
+        errors.append(e)
+        # Keep reading so that the writing end of src does not block forever
+        while src.read(SINK_CHUNK_SIZE):
+            pass
+
+
+@contextlib.contextmanager
+def _open_compressed_stream(
+    output: os.PathLike,
+    compress_program: Optional[str] = None,
+    compression: str = "gz",
+    sink: Optional[typing.Callable[[bytes], None]] = None,
+) -> typing.Iterator[typing.BinaryIO]:
+    """
+    Opens a writable stream whose contents are compressed into output. gzip data is piped through pigz (or the
+    given gzip-compatible program) if available, which compresses on all cores, otherwise the gzip module is used.
+    zstd compression also uses all cores, and requires the zstandard package.
+    :param os.PathLike output: Path of the compressed file to write
+    :param str compress_program: Program to compress with, pigz is auto-detected if not set. Only applies to gzip.
+    :param str compression: One of gz, zst or none
+    :param callable sink: Called with the compressed data in chunks of SINK_CHUNK_SIZE bytes as it is written
+    """
+    if compression not in FAST_FILEENDINGS:
+        raise ValueError(f"Unsupported compression {compression}, must be one of {list(FAST_FILEENDINGS)}")
+    if compress_program and compression != "gz":
+        raise ValueError(f"A compression program can only be used with gz compression, not {compression}")
+
+    if compression == "zst":
+        zstandard = _import_zstandard()
+        with _open_output(output, sink) as compressed:
+            # Level 3 compresses about as well as gzip does by default, threads=-1 uses all cores
+            compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+            with compressor.stream_writer(compressed, closefd=False) as zstd_stream:
+                yield zstd_stream
+        return
+
+    if compression == "none":
+        with _open_output(output, sink) as uncompressed:
+            yield uncompressed
+        return
+
+    program = shutil.which(compress_program or "pigz")
+    if compress_program and program is None:
+        raise ValueError(f"Compression program {compress_program} could not be found")
+
+    with _open_output(output, sink) as gzipped:
+        if program:
+            # -n omits the file name and timestamp from the gzip header so that the output is reproducible
+            proc = subprocess.Popen(
+                [program, "-n", "-c"],
+                stdin=subprocess.PIPE,
+                # The program can only write to the file directly if its output does not need to go to the sink
+                stdout=gzipped if sink is None else subprocess.PIPE,
+                bufsize=OUTPUT_BUFSIZE,
             )
+            pump_errors: List[BaseException] = []
+            pump = None
+            if sink is not None:
+                pump = threading.Thread(target=_pump, args=(proc.stdout, gzipped, pump_errors), daemon=True)
+                pump.start()
+            try:
+                yield proc.stdin
+            finally:
+                # Flushing fails if the program exited early, which is reported through its return code below
+                with contextlib.suppress(BrokenPipeError):
+                    proc.stdin.close()
+                if pump is not None:
+                    pump.join()
+                    proc.stdout.close()
+                returncode = proc.wait()
+            if pump_errors:
+                raise pump_errors[0]
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, proc.args)
+        else:
+            start_time = time.time()
+            with gzip.GzipFile(filename="", mode="wb", fileobj=gzipped, mtime=0) as gzip_stream:
+                yield gzip_stream
+
+            end_time = time.time()
+            warning_time = 10
+            if end_time - start_time > warning_time:
+                click.secho(
+                    f"Code tarball compression took {end_time - start_time:.0f} seconds. Consider installing `pigz` for faster compression.",
+                    fg="yellow",
+                )
+
+
+class _FdWriter:
+    """
+    Wraps a buffered file object that writes straight to a file descriptor, like a pipe, so that TarFile can write
+    to it directly. Pipes are not seekable, so the position is tracked here.
+    """
+
+    def __init__(self, fileobj: io.BufferedWriter):
+        self._fileobj = fileobj
+        self._pos = 0
+
+    def write(self, data: bytes) -> int:
+        self._pos += len(data)
+        return self._fileobj.write(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+    def fileno(self) -> int:
+        return self._fileobj.fileno()
+
+
+class _SendfileTarFile(tarfile.TarFile):
+    """
+    A TarFile that copies the contents of regular files to its output file descriptor with os.sendfile, so that they
+    are not copied through Python. Must only be used if nothing transforms the data written to the file descriptor.
+    """
+
+    def addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[typing.BinaryIO] = None) -> None:
+        # Files smaller than the copy buffer are read in one go, which is cheaper than flushing the output for them
+        if fileobj is None or not tarinfo.isreg() or tarinfo.size < TAR_BUFSIZE:
+            super().addfile(tarinfo, fileobj)
+            return
+
+        self._check("awx")
+        tarinfo = copy.copy(tarinfo)
+        with contextlib.suppress(AttributeError, OSError):
+            os.posix_fadvise(fileobj.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        buf = tarinfo.tobuf(self.format, self.encoding, self.errors)
+        self.fileobj.write(buf)
+        self.offset += len(buf)
+        # The header has to be written out before the contents are sent to the file descriptor
+        self.fileobj.flush()
+        _sendfile(fileobj, self.fileobj, tarinfo.size, self.copybufsize)
+        blocks, remainder = divmod(tarinfo.size, tarfile.BLOCKSIZE)
+        if remainder > 0:
+            self.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            blocks += 1
+        self.offset += blocks * tarfile.BLOCKSIZE
+
+        self.members.append(tarinfo)
+
+
+def _sendfile(src: typing.BinaryIO, dst: _FdWriter, size: int, bufsize: int) -> None:
+    """Copies size bytes from the start of src to dst with os.sendfile, or through Python if that is not supported."""
+    in_fd, out_fd = src.fileno(), dst.fileno()
+    offset = 0
+    while offset < size:
+        try:
+            sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+        except OSError:
+            if offset > 0:
+                raise
+            # E.g. the file system does not support sendfile. The file position of src was not changed.
+            tarfile.copyfileobj(src, dst, size, bufsize=bufsize)
+            return
+        if sent == 0:
+            raise OSError("unexpected end of data")
+        offset += sent
+
+
+def _open_tarfile(stream: typing.BinaryIO, deref_symlinks: bool) -> tarfile.TarFile:
+    """
+    Opens a tar archive that is written to stream. If stream writes straight to a file descriptor, i.e. it is an
+    uncompressed file or a pipe to a compression program, the contents of files are sent to it with os.sendfile.
+    """
+    if _USE_SENDFILE and isinstance(stream, (io.BufferedWriter, io.FileIO)):
+        return _SendfileTarFile(
+            fileobj=_FdWriter(stream), mode="w", dereference=deref_symlinks, copybufsize=TAR_BUFSIZE
+        )
+    return tarfile.open(
+        fileobj=stream, mode="w|", dereference=deref_symlinks, bufsize=TAR_BUFSIZE, copybufsize=TAR_BUFSIZE
+    )
 
 
 def fast_package(
@@ -101,6 +365,7 @@ def fast_package(
     output_dir: os.PathLike,
     deref_symlinks: bool = False,
     options: Optional[FastPackageOptions] = None,
+    sink: Optional[typing.Callable[[bytes], None]] = None,
 ) -> os.PathLike:
     """
     Takes a source directory and packages everything not covered by common ignores into a tarball
@@ -109,9 +374,14 @@ def fast_package(
     :param os.PathLike output_dir:
     :param bool deref_symlinks: Enables dereferencing symlinks when packaging directory
     :param options: The CopyFileDetection option set to None
+    :param callable sink: If given, also called with the compressed tarball in chunks of SINK_CHUNK_SIZE bytes while
+        it is written, e.g. to upload it in parts while it is still being compressed. The tarball is still written to
+        output_dir.
     :return os.PathLike:
     """
     default_ignores = [GitIgnore, DockerIgnore, StandardIgnore, FlyteIgnore]
+    compress_program = options.compress_program if options else None
+    compression = options.compression if options else "gz"
     if options is not None:
         if options.keep_default_ignores:
             ignores = options.ignores + default_ignores
@@ -133,11 +403,6 @@ def fast_package(
             TextColumn("{task.fields[files_added_progress]}"),
         )
 
-        compress_tarball_progress = Progress(
-            TimeElapsedColumn(),
-            TextColumn("[progress.description]{task.description}"),
-        )
-
         ls, ls_digest = ls_files(str(source), options.copy_style, deref_symlinks, ignore)
         logger.debug(f"Hash digest: {ls_digest}")
 
@@ -145,7 +410,7 @@ def fast_package(
             print_ls_tree(source, ls)
 
         # Compute where the archive should be written
-        archive_fname = f"{FAST_PREFIX}{ls_digest}{FAST_FILEENDING}"
+        archive_fname = f"{FAST_PREFIX}{ls_digest}{FAST_FILEENDINGS[compression]}"
         if output_dir is None:
             output_dir = tempfile.mkdtemp()
             click.secho(
@@ -167,12 +432,12 @@ def fast_package(
             create_tarball_progress.start()
 
         create_tarball_progress.start_task(tar_task)
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tar_path = os.path.join(tmp_dir, "tmp.tar")
-            with tarfile.open(tar_path, "w", dereference=deref_symlinks) as tar:
+        # The tarball is streamed into the compressor, so that archiving and compression run concurrently
+        with _open_compressed_stream(archive_fname, compress_program, compression, sink) as stream:
+            with _open_tarfile(stream, deref_symlinks) as tar:
                 for ws_file in ls:
                     files_processed = files_processed + 1
-                    rel_path = os.path.relpath(ws_file, start=source)
+                    rel_path = _relative_path(ws_file, source)
                     tar.add(
                         os.path.join(source, ws_file),
                         recursive=False,
@@ -188,99 +453,310 @@ def fast_package(
                         files_added_progress=f"{files_processed}/{total_files} files",
                     )
 
-            create_tarball_progress.stop_task(tar_task)
-            if is_display_progress_enabled():
-                create_tarball_progress.stop()
-                compress_tarball_progress.start()
-
-            tpath = pathlib.Path(tar_path)
-            size_mbs = tpath.stat().st_size / 1024 / 1024
-            compress_task = compress_tarball_progress.add_task(f"Compressing tarball size {size_mbs:.2f}MB...", total=1)
-            compress_tarball_progress.start_task(compress_task)
-            compress_tarball(tar_path, archive_fname)
-            arpath = pathlib.Path(archive_fname)
-            asize_mbs = arpath.stat().st_size / 1024 / 1024
-            compress_tarball_progress.update(
-                compress_task,
-                advance=1,
-                description=f"Tarball {size_mbs:.2f}MB compressed to {asize_mbs:.2f}MB",
-            )
-            compress_tarball_progress.stop_task(compress_task)
-            if is_display_progress_enabled():
-                compress_tarball_progress.stop()
+        asize_mbs = pathlib.Path(archive_fname).stat().st_size / 1024 / 1024
+        create_tarball_progress.update(tar_task, description=f"Created compressed tarball of {asize_mbs:.2f}MB")
+        create_tarball_progress.stop_task(tar_task)
+        if is_display_progress_enabled():
+            create_tarball_progress.stop()
 
     # Original tar command - This condition to be removed in the future after serialize is removed.
     else:
         # Remove this after original tar command is removed.
-        digest = compute_digest(source, ignore.is_ignored)
+        # Walk the source once, the same sorted list of entries is used to compute the digest and to add the
+        # entries to the archive one by one.
+        entries = _list_entries(source, ignore, deref_symlinks)
+        digest = _compute_files_digest(
+            [(path, rel_path, st) for path, rel_path, st in entries if _is_digestible(path, st)],
+            _default_digest_hasher(),
+        )
 
         # Compute where the archive should be written
-        archive_fname = f"{FAST_PREFIX}{digest}{FAST_FILEENDING}"
+        archive_fname = f"{FAST_PREFIX}{digest}{FAST_FILEENDINGS[compression]}"
         if output_dir is None:
             output_dir = tempfile.mkdtemp()
             click.secho(f"No output path provided, using a temporary directory at {output_dir} instead", fg="yellow")
         archive_fname = os.path.join(output_dir, archive_fname)
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tar_path = os.path.join(tmp_dir, "tmp.tar")
-            with tarfile.open(tar_path, "w", dereference=deref_symlinks) as tar:
-                files: typing.List[str] = os.listdir(source)
-                for ws_file in files:
-                    tar.add(
-                        os.path.join(source, ws_file),
-                        arcname=ws_file,
-                        filter=lambda x: ignore.tar_filter(tar_strip_file_attributes(x)),
-                    )
-
-            compress_tarball(tar_path, archive_fname)
+        with _open_compressed_stream(archive_fname, compress_program, compression, sink) as stream:
+            with _open_tarfile(stream, deref_symlinks) as tar:
+                for path, rel_path, _ in entries:
+                    tar.add(path, arcname=rel_path, recursive=False, filter=tar_strip_file_attributes)
 
     return archive_fname
 
 
-def compute_digest(source: Union[os.PathLike, List[os.PathLike]], filter: Optional[callable] = None) -> str:
+def _walk(
+    source: str, prune: Optional[callable] = None, follow_symlinks: bool = False
+) -> typing.Iterator[typing.Tuple[os.DirEntry, str]]:
     """
-    Walks the entirety of the source dir to compute a deterministic md5 hex digest of the dir contents.
+    Recursively walks source in sorted order, yielding each entry together with its path relative to source.
+    Unlike os.walk, the DirEntry is handed to the caller, so its cached file type and stat results can be
+    reused instead of stat'ing every path again.
+    :param str source:
+    :param callable prune: Called with the relative path of each directory, the walk does not descend into it if True
+    :param bool follow_symlinks: Whether to descend into symlinks to directories, each directory is walked only once
+    """
+    # This is needed to prevent infinite recursion when following symlinks
+    visited_inodes = set()
+
+    def walk_dir(path: str, rel_prefix: str) -> typing.Iterator[typing.Tuple[os.DirEntry, str]]:
+        if follow_symlinks:
+            st = os.stat(path)
+            if (st.st_dev, st.st_ino) in visited_inodes:
+                return
+            visited_inodes.add((st.st_dev, st.st_ino))
+
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+
+        for entry in entries:
+            rel_path = rel_prefix + entry.name
+            yield entry, rel_path
+            if entry.is_dir(follow_symlinks=follow_symlinks) and not (prune and prune(rel_path)):
+                yield from walk_dir(entry.path, rel_path + os.sep)
+
+    yield from walk_dir(source, "")
+
+
+def _list_entries(
+    source: os.PathLike, ignore: Ignore, deref_symlinks: bool = False
+) -> List[typing.Tuple[str, str, Optional[os.stat_result]]]:
+    """
+    Lists all entries below source that are not ignored, as (path, relative path, stat result) in sorted order.
+    Directories are listed as well, so that empty directories end up in the archive. The stat result follows
+    symlinks and is None for symlinks that point to non-existent files.
+    """
+
+    def prune(rel_path: str) -> bool:
+        # Like tarfile's filter used to, skip everything below ignored directories
+        return ignore.is_ignored(rel_path) or ignore.ignores_dir_contents(rel_path)
+
+    entries = []
+    for entry, rel_path in _walk(os.fspath(source), prune, follow_symlinks=deref_symlinks):
+        if ignore.is_ignored(rel_path):
+            continue
+        entries.append((entry.path, rel_path, _stat_entry(entry)))
+    return entries
+
+
+def _stat_entry(entry: os.DirEntry) -> Optional[os.stat_result]:
+    """Stats entry following symlinks, returns None for symlinks that point to non-existent files."""
+    # For anything but a symlink this is the stat result cached by the DirEntry, no system call is needed
+    st = entry.stat(follow_symlinks=False)
+    if not stat.S_ISLNK(st.st_mode):
+        return st
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
+
+def _is_digestible(path: str, st: Optional[os.stat_result]) -> bool:
+    """Whether the contents of the file at path are part of a digest."""
+    # Disregard symlinks that point to non-existent files
+    if st is None:
+        logger.info(f"Skipping non-existent file {path}")
+        return False
+
+    # Directories only contribute the files below them
+    if stat.S_ISDIR(st.st_mode):
+        return False
+
+    # Skip socket files, FIFOs and devices, opening them could block or fail
+    if not stat.S_ISREG(st.st_mode):
+        logger.info(f"Skip non-regular file {path}")
+        return False
+
+    return True
+
+
+@functools.lru_cache
+def _default_digest_hasher() -> typing.Callable:
+    """
+    Returns the fastest available hash constructor for content digests. The digest is only used as a
+    fingerprint, so a non-cryptographic hash is acceptable. Prefers blake3, then xxh3, and falls back to md5.
+    """
+    try:
+        import blake3
+
+        # Not multi-threaded with max_threads, large files are already hashed concurrently on a thread pool
+        return blake3.blake3
+    except ImportError:
+        pass
+
+    try:
+        import xxhash
+
+        return xxhash.xxh3_128
+    except ImportError:
+        pass
+
+    return hashlib.md5
+
+
+@contextlib.contextmanager
+def _open_digest_cache() -> typing.Iterator[Optional[Cache]]:
+    cache = None
+    try:
+        cache = Cache(
+            DIGEST_CACHE_LOCATION,
+            timeout=DIGEST_CACHE_TIMEOUT,
+            size_limit=DIGEST_CACHE_SIZE_LIMIT,
+            eviction_policy="least-recently-used",
+        )
+    except (OSError, sqlite3.Error, Timeout) as e:
+        logger.debug(f"Digest cache at {DIGEST_CACHE_LOCATION} is not available, hashing all files: {e}")
+
+    try:
+        yield cache
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _compute_file_digest(
+    path: str, st: os.stat_result, hasher: typing.Callable, cache: Optional[Cache] = None
+) -> bytes:
+    """
+    Computes the digest of a single file. If a cache is given, the digest of a large file is reused for as long as
+    the file's inode, size and modification times, as given by st, are unchanged. The cache is best-effort, the file
+    is hashed if it cannot be read from or written to.
+    """
+    file_hasher = hasher()
+    if cache is None or st.st_size < DIGEST_CACHE_MIN_FILE_SIZE:
+        _filehash_update(path, file_hasher)
+        return file_hasher.digest()
+
+    key = f"{file_hasher.name}:{os.path.abspath(path)}"
+    fingerprint = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    try:
+        cached = cache.get(key)
+    except (OSError, sqlite3.Error, Timeout) as e:
+        logger.debug(f"Could not read the digest of {path} from the digest cache: {e}")
+        cached = None
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    _filehash_update(path, file_hasher)
+    digest = file_hasher.digest()
+    if time.time_ns() - st.st_mtime_ns > DIGEST_CACHE_RACY_WINDOW_NS:
+        try:
+            cache.set(key, (fingerprint, digest))
+        except (OSError, sqlite3.Error, Timeout) as e:
+            logger.debug(f"Could not write the digest of {path} to the digest cache: {e}")
+    return digest
+
+
+def compute_digest(
+    source: Union[os.PathLike, List[os.PathLike]],
+    filter: Optional[callable] = None,
+    hasher: Optional[typing.Callable] = None,
+) -> str:
+    """
+    Walks the entirety of the source dir to compute a deterministic hex digest of the dir contents.
+    Files are combined into the digest in the order they were walked. Large files are hashed concurrently, and their
+    digests are cached under DIGEST_CACHE_LOCATION, so unchanged files are not hashed again on subsequent calls.
     :param os.PathLike source:
     :param callable filter:
+    :param callable hasher: Hash constructor to use, defaults to blake3 or xxh3 if installed, otherwise md5
     :return Text:
     """
-    hasher = hashlib.md5()
+    if hasher is None:
+        hasher = _default_digest_hasher()
+    files: List[typing.Tuple[str, str, os.stat_result]] = []
+
+    for src in source if isinstance(source, list) else [source]:
+        src = os.fspath(src)
+        try:
+            st = os.stat(src)
+        except FileNotFoundError:
+            st = None
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            # Symlinks to directories below src are not followed
+            for entry, rel_path in _walk(src):
+                if entry.is_dir(follow_symlinks=False):
+                    continue
+                entry_st = _stat_entry(entry)
+                if _is_digestible(entry.path, entry_st) and not (filter and filter(rel_path)):
+                    files.append((entry.path, rel_path, entry_st))
+        elif _is_digestible(src, st) and not (filter and filter(os.path.basename(src))):
+            files.append((src, os.path.basename(src), st))
+
+    return _compute_files_digest(files, hasher)
+
+
+def _compute_files_digest(files: List[typing.Tuple[str, str, os.stat_result]], hasher: typing.Callable) -> str:
+    """
+    Computes a hex digest of the given (path, relative path, stat result) files with a single running hash. Each file
+    is framed by the lengths of its relative path and its contents, followed by the path and the contents. Files of at
+    least DIGEST_CACHE_MIN_FILE_SIZE are hashed separately and concurrently instead, and their cached digests stand in
+    for their contents.
+    """
+    large_files = [(path, st) for path, _, st in files if st.st_size >= DIGEST_CACHE_MIN_FILE_SIZE]
+    digest_hasher = hasher()
+    with contextlib.ExitStack() as stack:
+        file_digests = iter(())
+        # Only large files need the digest cache and thread pool, setting them up costs more than hashing small files
+        if large_files:
+            cache = stack.enter_context(_open_digest_cache())
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=min(len(large_files), os.cpu_count() or 1)))
+            compute_file_digest = functools.partial(_compute_file_digest, hasher=hasher, cache=cache)
+            # Hash functions release the GIL while hashing, so large files are hashed in parallel using threads while
+            # small files are read into the running hash
+            file_digests = executor.map(
+                compute_file_digest, [path for path, _ in large_files], [st for _, st in large_files]
+            )
+        for path, rel_path, st in files:
+            # Use POSIX paths, so that the digest does not depend on the platform
+            rel_path_bytes = os.fsencode(rel_path.replace(os.sep, "/"))
+            if st.st_size >= DIGEST_CACHE_MIN_FILE_SIZE:
+                size, data = st.st_size, next(file_digests)
+            else:
+                with open(path, "rb", buffering=0) as f:
+                    data = f.read()
+                size = len(data)
+            digest_hasher.update(struct.pack("!IQ", len(rel_path_bytes), size))
+            digest_hasher.update(rel_path_bytes)
+            digest_hasher.update(data)
 
-    def compute_digest_for_file(path: os.PathLike, rel_path: os.PathLike) -> None:
-        # Only consider files that exist (e.g. disregard symlinks that point to non-existent files)
-        if not os.path.exists(path):
-            logger.info(f"Skipping non-existent file {path}")
-            return
+    return digest_hasher.hexdigest()
 
-        # Skip socket files
-        if stat.S_ISSOCK(os.stat(path).st_mode):
-            logger.info(f"Skip socket file {path}")
-            return
 
-        if filter:
-            if filter(rel_path):
-                return
+def _compute_legacy_digest(source: Union[os.PathLike, List[os.PathLike]]) -> str:
+    """
+    Computes the md5 hex digest that compute_digest used to compute, of the contents and relative paths of all files
+    in a single running hash. Used where digests have to stay stable, e.g. in ImageSpec tags.
+    :param os.PathLike source:
+    :return Text:
+    """
+    hasher = hashlib.md5()
 
-        _filehash_update(path, hasher)
-        _pathhash_update(rel_path, hasher)
+    def digest_file(path: str, rel_path: str) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Disregard symlinks that point to non-existent files
+            logger.info(f"Skipping non-existent file {path}")
+            return
+        if _is_digestible(path, st):
+            _filehash_update(path, hasher)
+            _pathhash_update(rel_path, hasher)
 
-    def compute_digest_for_dir(source: os.PathLike) -> None:
+    def digest_dir(source: str) -> None:
         for root, _, files in os.walk(source, topdown=True):
             files.sort()
-
             for fname in files:
                 abspath = os.path.join(root, fname)
-                relpath = os.path.relpath(abspath, source)
-                compute_digest_for_file(abspath, relpath)
+                digest_file(abspath, os.path.relpath(abspath, source))
 
     if isinstance(source, list):
         for src in source:
             if os.path.isdir(src):
-                compute_digest_for_dir(src)
+                digest_dir(src)
             else:
-                compute_digest_for_file(src, os.path.basename(src))
+                digest_file(src, os.path.basename(src))
     else:
-        compute_digest_for_dir(source)
+        digest_dir(source)
 
     return hasher.hexdigest()
 
@@ -313,13 +789,27 @@ def download_distribution(additional_distribution: str, destination: str):
     except FlyteDataNotFoundException as ex:
         raise RuntimeError("task execution code was not found") from ex
     tarfile_name = os.path.basename(additional_distribution)
-    if tarfile_name.endswith(".tar.gz"):
+    if tarfile_name.endswith(".tar.gz") or tarfile_name.endswith(FAST_FILEENDINGS["none"]):
         # This will overwrite the existing user flyte workflow code in the current working code dir.
         result = subprocess.run(
             ["tar", "-xvf", os.path.join(destination, tarfile_name), "-C", destination],
             stdout=subprocess.PIPE,
         )
         result.check_returncode()
+    elif tarfile_name.endswith(FAST_FILEENDINGS["zst"]):
+        # Decompress in python and pipe to tar, so that the zstd executable does not need to be installed
+        zstandard = _import_zstandard()
+        with open(os.path.join(destination, tarfile_name), "rb") as compressed:
+            proc = subprocess.Popen(
+                ["tar", "-xf", "-", "-C", destination], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL
+            )
+            try:
+                zstandard.ZstdDecompressor().copy_stream(compressed, proc.stdin)
+            finally:
+                proc.stdin.close()
+                returncode = proc.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, proc.args)
     elif tarfile_name != PICKLE_FILE_PATH:
         # The distribution is not a pickled file.
         raise RuntimeError("Unrecognized additional distribution format for {}".format(additional_distribution))
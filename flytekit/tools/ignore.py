@@ -1,15 +1,19 @@
 import os
+import re
 import subprocess
 import tarfile
 from abc import ABC, abstractmethod
-from fnmatch import fnmatch
+from fnmatch import translate
 from pathlib import Path
 from shutil import which
-from typing import List, Optional, Type
+from typing import Dict, List, Optional, Pattern, Tuple, Type
 
-from docker.utils.build import PatternMatcher
+from docker.utils.build import PatternMatcher, normalize_slashes, split_path
+from docker.utils.fnmatch import fnmatch as docker_fnmatch
+from docker.utils.fnmatch import translate as docker_translate
 
 from flytekit.loggers import logger
+from flytekit.tools._paths import _relative_path
 
 STANDARD_IGNORE_PATTERNS = ["*.pyc", ".cache", ".cache/*", "__pycache__/*", "**/__pycache__/*"]
 
@@ -19,12 +23,23 @@ class Ignore(ABC):
 
     def __init__(self, root: str):
         self.root = root
+        # Absolute paths below root are made relative by slicing off this prefix, which is much faster than relpath
+        self._root_prefix = os.path.join(os.path.abspath(root), "")
 
     def is_ignored(self, path: str) -> bool:
         if os.path.isabs(path):
-            path = os.path.relpath(path, self.root)
+            path = self._relative_path(path)
         return self._is_ignored(path)
 
+    def ignores_dir_contents(self, path: str) -> bool:
+        """Whether everything below the directory at path is ignored, so that it does not need to be walked."""
+        if os.path.isabs(path):
+            path = self._relative_path(path)
+        return self._ignores_dir_contents(path)
+
+    def _relative_path(self, path: str) -> str:
+        return _relative_path(os.fspath(path), self.root, self._root_prefix)
+
     def tar_filter(self, tarinfo: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
         if self.is_ignored(tarinfo.name):
             return None
@@ -34,6 +49,11 @@ class Ignore(ABC):
     def _is_ignored(self, path: str) -> bool:
         pass
 
+    def _ignores_dir_contents(self, path: str) -> bool:
+        # An ignored directory may still contain files that are not ignored, so only Ignores that can tell otherwise
+        # allow skipping directories
+        return False
+
 
 class GitIgnore(Ignore):
     """Uses git cli (if available) to list all ignored files and compare with those."""
@@ -67,13 +87,97 @@ class GitIgnore(Ignore):
     def _is_ignored(self, path: str) -> bool:
         if self.ignored_files:
             # git-ls-files uses POSIX paths
-            if Path(path).as_posix() in self.ignored_files:
+            posix_path = Path(path).as_posix()
+            if posix_path in self.ignored_files:
                 return True
             # Ignore empty directories
-            if os.path.isdir(os.path.join(self.root, path)) and self.ignored_dirs:
-                return Path(path).as_posix() + "/" in self.ignored_dirs
+            return posix_path + "/" in self.ignored_dirs and os.path.isdir(os.path.join(self.root, path))
         return False
 
+    def _ignores_dir_contents(self, path: str) -> bool:
+        # git does not look for files to re-include in ignored directories
+        return Path(path).as_posix() + "/" in self.ignored_dirs
+
+
+class CompiledPatternMatcher(PatternMatcher):
+    """Matches paths exactly like docker-py's PatternMatcher, but compiles the patterns once upfront instead of
+    matching them one by one through docker's fnmatch, whose regex cache only holds 100 patterns.
+
+    The last matching pattern decides whether a path is matched, so consecutive patterns of the same kind (ignore or
+    exclusion) are combined into a single regex. A pattern with n components also matches any path whose first n
+    parent directories it matches, so these are additionally grouped by n."""
+
+    def __init__(self, patterns: List[str]):
+        super().__init__(patterns)
+        self._runs: List[Tuple[bool, Pattern, Dict[int, Pattern]]] = []
+        start = 0
+        for i, pattern in enumerate(self.patterns):
+            if i + 1 == len(self.patterns) or self.patterns[i + 1].exclusion != pattern.exclusion:
+                self._runs.append(self._compile_run(self.patterns[start : i + 1]))
+                start = i + 1
+        # The last run that matches a path decides whether it is matched
+        self._runs.reverse()
+
+    @staticmethod
+    def _compile_run(patterns: list) -> Tuple[bool, Pattern, Dict[int, Pattern]]:
+        def union(run: list) -> Pattern:
+            # docker's fnmatch compares lowercased paths and patterns
+            return re.compile("|".join(f"(?:{docker_translate(p.cleaned_pattern.lower())})" for p in run))
+
+        by_dirs: Dict[int, list] = {}
+        for pattern in patterns:
+            by_dirs.setdefault(len(pattern.dirs), []).append(pattern)
+        return patterns[0].exclusion, union(patterns), {n: union(run) for n, run in by_dirs.items()}
+
+    def matches(self, filepath: str) -> bool:
+        path = normalize_slashes(filepath).lower()
+        parent_path = os.path.dirname(filepath)
+        parent_path_dirs = split_path(parent_path) if parent_path != "" else []
+        parent_prefixes: Dict[int, str] = {}
+
+        for exclusion, regex, regex_by_dirs in self._runs:
+            if regex.match(path):
+                return not exclusion
+            for n, dirs_regex in regex_by_dirs.items():
+                if n > len(parent_path_dirs):
+                    continue
+                if n not in parent_prefixes:
+                    parent_prefixes[n] = normalize_slashes(os.path.sep.join(parent_path_dirs[:n])).lower()
+                if dirs_regex.match(parent_prefixes[n]):
+                    return not exclusion
+        return False
+
+    def matches_dir_contents(self, dirpath: str) -> bool:
+        """Whether all paths below dirpath are matched. A path is matched by a pattern with n components if its first
+        n parent directories match it, so this is the case if such a pattern matches the first n components of
+        dirpath, and no exclusion pattern could match any path below it. The directory itself matching is not enough,
+        e.g. **/b matches x/a/b but not x/a/b/c."""
+        dirs = split_path(normalize_slashes(dirpath))
+        if not any(
+            not p.exclusion
+            and len(p.dirs) <= len(dirs)
+            and docker_fnmatch("/".join(dirs[: len(p.dirs)]), p.cleaned_pattern)
+            for p in self.patterns
+        ):
+            return False
+        return not any(p.exclusion and self._could_match_below(p.dirs, dirs) for p in self.patterns)
+
+    @staticmethod
+    def _could_match_below(pattern_dirs: List[str], dirs: List[str]) -> bool:
+        """Whether a pattern with the components pattern_dirs could match any path below the directory with the
+        components dirs. Errs on the side of True."""
+        for i, pattern_dir in enumerate(pattern_dirs):
+            # ** matches any number of components
+            if "**" in pattern_dir:
+                return True
+            # The remaining components of the pattern can match paths below the directory
+            if i == len(dirs):
+                return True
+            if not docker_fnmatch(dirs[i], pattern_dir):
+                return False
+        # The pattern matches the directory or one of its parents, and with that everything below it
+        return True
+
 
 class DockerIgnore(Ignore):
     """Uses docker-py's PatternMatcher to check whether a path is ignored."""
@@ -90,11 +194,14 @@ class DockerIgnore(Ignore):
                 patterns = [l.strip() for l in f.readlines() if l and not l.startswith("#")]
         else:
             logger.info(f"No .dockerignore found in {self.root}, not applying any filters")
-        return PatternMatcher(patterns)
+        return CompiledPatternMatcher(patterns)
 
     def _is_ignored(self, path: str) -> bool:
         return self.pm.matches(path)
 
+    def _ignores_dir_contents(self, path: str) -> bool:
+        return self.pm.matches_dir_contents(path)
+
 
 class FlyteIgnore(Ignore):
     """Uses a .flyteignore file to determine ignored files."""
@@ -111,11 +218,19 @@ class FlyteIgnore(Ignore):
                 patterns = [l.strip() for l in f.readlines() if l and not l.startswith("#")]
         else:
             logger.info(f"No .flyteignore found in {self.root}, not applying any filters")
-        return PatternMatcher(patterns)
+        return CompiledPatternMatcher(patterns)
 
     def _is_ignored(self, path: str) -> bool:
         return self.pm.matches(path)
 
+    def _ignores_dir_contents(self, path: str) -> bool:
+        return self.pm.matches_dir_contents(path)
+
+
+def _has_glob(pattern: str) -> bool:
+    """Whether pattern contains any of fnmatch's wildcards."""
+    return any(c in pattern for c in "*?[")
+
 
 class StandardIgnore(Ignore):
     """Retains the standard ignore functionality that previously existed. Could in theory
@@ -124,12 +239,25 @@ class StandardIgnore(Ignore):
     def __init__(self, root: Path, patterns: Optional[List[str]] = None):
         super().__init__(root)
         self.patterns = patterns if patterns else STANDARD_IGNORE_PATTERNS
+        # Patterns without wildcards only match the exact path, so they are looked up in a set
+        self._literals = frozenset(os.path.normcase(pattern) for pattern in self.patterns if not _has_glob(pattern))
+        # Matches like fnmatch against any of the other patterns, with a single regex
+        globs = [translate(os.path.normcase(pattern)) for pattern in self.patterns if _has_glob(pattern)]
+        self._regex = re.compile("|".join(globs)) if globs else None
+        # A pattern ending in * that matches "dir/" matches everything below dir as well
+        dir_patterns = [translate(os.path.normcase(pattern)) for pattern in self.patterns if pattern.endswith("*")]
+        self._dir_contents_regex = re.compile("|".join(dir_patterns)) if dir_patterns else None
 
     def _is_ignored(self, path: str) -> bool:
-        for pattern in self.patterns:
-            if fnmatch(path, pattern):
-                return True
-        return False
+        path = os.path.normcase(path)
+        if path in self._literals:
+            return True
+        return self._regex is not None and self._regex.match(path) is not None
+
+    def _ignores_dir_contents(self, path: str) -> bool:
+        if self._dir_contents_regex is None:
+            return False
+        return self._dir_contents_regex.match(os.path.normcase(path + "/")) is not None
 
 
 class IgnoreGroup(Ignore):
@@ -146,11 +274,14 @@ class IgnoreGroup(Ignore):
                 return True
         return False
 
+    def _ignores_dir_contents(self, path: str) -> bool:
+        return any(ignore.ignores_dir_contents(path) for ignore in self.ignores)
+
     def list_ignored(self) -> List[str]:
         ignored = []
         for root, _, files in os.walk(self.root):
             for file in files:
                 abs_path = os.path.join(root, file)
                 if self.is_ignored(abs_path):
-                    ignored.append(os.path.relpath(abs_path, self.root))
+                    ignored.append(self._relative_path(abs_path))
         return ignored
@@ -19,6 +19,7 @@ from typing import List, Optional, Tuple, Union
 import flytekit
 from flytekit.constants import CopyFileDetection
 from flytekit.loggers import logger
+from flytekit.tools._paths import _relative_path
 from flytekit.tools.ignore import IgnoreGroup
 
 
@@ -82,6 +83,9 @@ def tar_strip_file_attributes(tar_info: tarfile.TarInfo) -> tarfile.TarInfo:
     tar_info.gid = 0
     tar_info.gname = ""
 
+    # drop group/other write and special bits, which depend on the umask of whoever created the files
+    tar_info.mode &= 0o755
+
     # stripping paxheaders may not be required
     # see https://stackoverflow.com/questions/34688392/paxheaders-in-tarball
     tar_info.pax_headers = {}
@@ -123,7 +127,7 @@ def ls_files(
     all_files.sort()
     hasher = hashlib.md5()
     for abspath in all_files:
-        relpath = os.path.relpath(abspath, source_path)
+        relpath = _relative_path(abspath, source_path)
         _filehash_update(abspath, hasher)
         _pathhash_update(relpath, hasher)
 
@@ -133,12 +137,13 @@ def ls_files(
 
 
 def _filehash_update(path: Union[os.PathLike, str], hasher: hashlib._Hash) -> None:
-    blocksize = 65536
-    with open(path, "rb") as f:
-        bytes = f.read(blocksize)
-        while bytes:
-            hasher.update(bytes)
-            bytes = f.read(blocksize)
+    blocksize = 1024 * 1024
+    with open(path, "rb", buffering=0) as f:
+        # Read into a single reusable buffer, sized down for small files, to avoid allocating a new bytes per chunk
+        buffer = bytearray(min(blocksize, max(os.fstat(f.fileno()).st_size, 1)))
+        view = memoryview(buffer)
+        while size := f.readinto(buffer):
+            hasher.update(view[:size])
 
 
 def _pathhash_update(path: Union[os.PathLike, str], hasher: hashlib._Hash) -> None:
@@ -157,6 +162,9 @@ def list_all_files(source_path: str, deref_symlinks, ignore_group: Optional[Igno
 
     for root, dirnames, files in os.walk(source_path, topdown=True, followlinks=deref_symlinks):
         dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+        if ignore_group:
+            # Do not walk directories of which all contents would be ignored anyway
+            dirnames[:] = [d for d in dirnames if not ignore_group.ignores_dir_contents(os.path.join(root, d))]
         if deref_symlinks:
             inode = os.stat(root).st_ino
             if inode in visited_inodes:
@@ -167,17 +175,23 @@ def list_all_files(source_path: str, deref_symlinks, ignore_group: Optional[Igno
         files.sort()
         for fname in files:
             abspath = os.path.join(root, fname)
-            # Only consider files that exist (e.g. disregard symlinks that point to non-existent files)
-            if not os.path.exists(abspath):
-                logger.info(f"Skipping non-existent file {abspath}")
-                continue
-            # Skip socket files
-            if stat.S_ISSOCK(os.stat(abspath).st_mode):
-                logger.info(f"Skip socket file {abspath}")
-                continue
+            # Check ignores first, so that ignored files are not stat'ed
             if ignore_group:
                 if ignore_group.is_ignored(abspath):
                     continue
+            # Only consider regular files and symlinks to them, checking the file type before anything is opened
+            st = os.lstat(abspath)
+            if stat.S_ISLNK(st.st_mode):
+                try:
+                    st = os.stat(abspath)
+                except OSError:
+                    # Disregard symlinks that point to non-existent files
+                    logger.info(f"Skipping non-existent file {abspath}")
+                    continue
+            # Skip socket files, FIFOs and devices
+            if not stat.S_ISREG(st.st_mode):
+                logger.info(f"Skip non-regular file {abspath}")
+                continue
 
             ff.append(abspath)
         all_files.extend(ff)
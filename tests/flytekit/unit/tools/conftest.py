@@ -0,0 +1,9 @@
+import pytest
+
+from flytekit.tools import fast_registration
+
+
+@pytest.fixture(autouse=True)
+def digest_cache_location(tmp_path_factory, monkeypatch):
+    """Keep the digest cache of compute_digest out of the home directory of whoever runs the tests."""
+    monkeypatch.setattr(fast_registration, "DIGEST_CACHE_LOCATION", str(tmp_path_factory.mktemp("digest-cache")))
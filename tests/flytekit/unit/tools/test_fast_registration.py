@@ -1,21 +1,29 @@
 import os
+import shutil
 import socket
+import sqlite3
 import subprocess
 import sys
 import tarfile
 import tempfile
 import time
-from hashlib import md5
+from hashlib import md5, sha256
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from diskcache import Timeout
 
 from flytekit.constants import CopyFileDetection
+from flytekit.tools import fast_registration
 from flytekit.tools.fast_registration import (
     FAST_FILEENDING,
+    FAST_FILEENDINGS,
     FAST_PREFIX,
     FastPackageOptions,
+    _compute_legacy_digest,
     compute_digest,
+    download_distribution,
     fast_package,
     get_additional_distribution_loc,
 )
@@ -78,6 +86,16 @@ def test_skip_socket_file():
     compute_digest(str(tmp_dir))
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="FIFOs do not exist on windows")
+def test_skip_fifo_file(tmp_path):
+    (tmp_path / "file.py").write_text("print('Hello World!')")
+    digest = compute_digest(tmp_path)
+
+    # Opening a FIFO would block until something writes to it
+    os.mkfifo(tmp_path / "test.fifo")
+    assert compute_digest(tmp_path) == digest
+
+
 def test_package(flyte_project, tmp_path):
     archive_fname = fast_package(source=flyte_project, output_dir=tmp_path)
     with tarfile.open(archive_fname) as tar:
@@ -121,6 +139,20 @@ def test_package_with_ignore(flyte_project, tmp_path):
     assert str(archive_fname).endswith(FAST_FILEENDING)
 
 
+def test_package_with_ignored_dir(tmp_path_factory):
+    class BuildIgnore(Ignore):
+        def _is_ignored(self, path: str) -> bool:
+            return path == "build"
+
+    source = tmp_path_factory.mktemp("source")
+    make_tree(source, {"build": {"x.py": ""}, "main.py": ""})
+    options = FastPackageOptions(ignores=[BuildIgnore], keep_default_ignores=False)
+    archive_fname = fast_package(source=source, output_dir=tmp_path_factory.mktemp("out"), options=options)
+    with tarfile.open(archive_fname) as tar:
+        # Files below an ignored directory are not packaged, even if they are not ignored themselves
+        assert tar.getnames() == ["main.py"]
+
+
 def test_package_with_ignore_without_defaults(flyte_project, tmp_path):
     class TestIgnore(Ignore):
         def _is_ignored(self, path: str) -> bool:
@@ -159,6 +191,39 @@ def test_package_with_symlink(flyte_project, tmp_path):
     assert str(archive_fname).endswith(FAST_FILEENDING)
 
 
+def test_package_with_symlinked_dir(flyte_project, tmp_path):
+    os.symlink(flyte_project / "utils", flyte_project / "src" / "utils")
+    archive_fname = fast_package(source=flyte_project / "src", output_dir=tmp_path, deref_symlinks=True)
+    with tarfile.open(archive_fname) as tar:
+        # Entries are added in sorted order, with the contents of symlinked directories
+        assert tar.getnames() == [
+            "util",
+            "utils",
+            "utils/util.py",
+            "workflows",
+            "workflows/__pycache__",
+            "workflows/hello_world.py",
+        ]
+        assert tar.getmember("utils").isdir()
+
+
+def test_package_is_reproducible(flyte_project, tmp_path_factory):
+    os.chmod(flyte_project / "utils" / "util.py", 0o664)
+
+    archive_fname_1 = fast_package(source=flyte_project, output_dir=tmp_path_factory.mktemp("dir1"))
+    archive_1_bytes = Path(archive_fname_1).read_bytes()
+    time.sleep(1)
+    (flyte_project / "utils" / "util.py").touch()
+    archive_fname_2 = fast_package(source=flyte_project, output_dir=tmp_path_factory.mktemp("dir2"))
+
+    assert md5(archive_1_bytes).hexdigest() == md5(Path(archive_fname_2).read_bytes()).hexdigest()
+    with tarfile.open(archive_fname_2) as tar:
+        util = tar.getmember("utils/util.py")
+        assert util.mode == 0o644
+        assert util.uid == util.gid == 0
+        assert util.uname == util.gname == ""
+
+
 def test_digest_ignore(flyte_project):
     ignore = IgnoreGroup(flyte_project, [GitIgnore, DockerIgnore, StandardIgnore])
     digest1 = compute_digest(flyte_project, ignore.is_ignored)
@@ -183,6 +248,83 @@ def test_digest_change(flyte_project):
     assert digest1 != digest2
 
 
+def test_digest_with_hasher(flyte_project):
+    digest = compute_digest(flyte_project, hasher=sha256)
+    assert len(digest) == 64
+    assert digest == compute_digest(flyte_project, hasher=sha256)
+    assert digest != compute_digest(flyte_project, hasher=md5)
+
+
+def test_digest_framing(tmp_path_factory):
+    # Paths and contents that concatenate to the same bytes result in different digests
+    tree1 = tmp_path_factory.mktemp("tree1")
+    make_tree(tree1, {"a": "bc"})
+    tree2 = tmp_path_factory.mktemp("tree2")
+    make_tree(tree2, {"ab": "c"})
+    assert compute_digest(tree1) != compute_digest(tree2)
+
+
+def test_legacy_digest(tmp_path):
+    make_tree(tmp_path, {"a.txt": "x", "sub": {"b.txt": "y"}})
+    os.mkfifo(tmp_path / "test.fifo")
+
+    # md5 of the contents and the relative paths without separators of all files, as ImageSpec tags have always used
+    expected = md5(b"x" + b"a.txt" + b"y" + b"subb.txt").hexdigest()
+    assert _compute_legacy_digest(tmp_path) == expected
+    assert _compute_legacy_digest([str(tmp_path)]) == expected
+    assert _compute_legacy_digest([str(tmp_path / "sub" / "b.txt")]) == md5(b"y" + b"b.txt").hexdigest()
+
+
+def test_digest_with_large_files(flyte_project, monkeypatch):
+    digest = compute_digest(flyte_project)
+
+    # Files hashed separately contribute their digests instead of their contents, which changes the digest
+    monkeypatch.setattr(fast_registration, "DIGEST_CACHE_MIN_FILE_SIZE", 10)
+    large_digest = compute_digest(flyte_project)
+    assert large_digest != digest
+    assert compute_digest(flyte_project) == large_digest
+
+    (flyte_project / "utils" / "util.py").write_text("print('Hello from changed utils!')")
+    assert compute_digest(flyte_project) != large_digest
+
+
+def test_digest_cache(flyte_project, monkeypatch):
+    monkeypatch.setattr(fast_registration, "DIGEST_CACHE_MIN_FILE_SIZE", 0)
+    # Files modified just now are not cached, so move all modification times to the past
+    for root, _, files in os.walk(flyte_project):
+        for fname in files:
+            os.utime(os.path.join(root, fname), ns=(0, 0))
+
+    digest1 = compute_digest(flyte_project)
+    with patch("flytekit.tools.fast_registration._filehash_update") as mock_filehash_update:
+        assert compute_digest(flyte_project) == digest1
+        mock_filehash_update.assert_not_called()
+
+    change_file = flyte_project / "src" / "workflows" / "hello_world.py"
+    change_file.write_text("print('I do matter!')")
+    assert compute_digest(flyte_project) != digest1
+
+
+def test_digest_cache_errors(flyte_project, monkeypatch):
+    monkeypatch.setattr(fast_registration, "DIGEST_CACHE_MIN_FILE_SIZE", 0)
+    digest = compute_digest(flyte_project)
+
+    # The digest cache is best-effort, files are hashed if it fails
+    with patch("diskcache.Cache.get", side_effect=sqlite3.OperationalError("database is locked")), patch(
+        "diskcache.Cache.set", side_effect=Timeout()
+    ):
+        assert compute_digest(flyte_project) == digest
+
+
+def test_digest_cache_not_opened_for_small_files(flyte_project):
+    with patch("flytekit.tools.fast_registration._open_digest_cache") as mock_open_digest_cache, patch(
+        "flytekit.tools.fast_registration.ThreadPoolExecutor"
+    ) as mock_executor:
+        compute_digest(flyte_project)
+    mock_open_digest_cache.assert_not_called()
+    mock_executor.assert_not_called()
+
+
 def test_get_additional_distribution_loc():
     assert get_additional_distribution_loc("s3://my-s3-bucket/dir", "123abc") == "s3://my-s3-bucket/dir/123abc.tar.gz"
 
@@ -232,3 +374,110 @@ def test_package_with_pigz(flyte_project, tmp_path):
 
     # Compare the md5sum of the two tarballs
     assert md5(archive_1_bytes).hexdigest() == md5(Path(archive_fname_2).read_bytes()).hexdigest()
+
+
+def test_package_with_compress_program(flyte_project, tmp_path):
+    options = FastPackageOptions(ignores=[], copy_style=CopyFileDetection.ALL, compress_program="gzip")
+
+    archive_fname = fast_package(source=flyte_project, output_dir=tmp_path, options=options)
+    with tarfile.open(archive_fname) as tar:
+        assert "src/workflows/hello_world.py" in tar.getnames()
+
+    options = FastPackageOptions(ignores=[], copy_style=CopyFileDetection.ALL, compress_program="not-a-compressor")
+    with pytest.raises(ValueError, match="not-a-compressor"):
+        fast_package(source=flyte_project, output_dir=tmp_path / "missing", options=options)
+
+
+@pytest.mark.skipif(shutil.which("false") is None, reason="false is not installed")
+def test_package_with_failing_compress_program(flyte_project, tmp_path_factory):
+    output_dir = tmp_path_factory.mktemp("out")
+    # false exits without reading its input, so writing to it fails with a broken pipe
+    options = FastPackageOptions(
+        ignores=[], keep_default_ignores=False, copy_style=CopyFileDetection.ALL, compress_program="false"
+    )
+    with patch.object(subprocess.Popen, "wait", autospec=True, side_effect=subprocess.Popen.wait) as mock_wait:
+        with pytest.raises((BrokenPipeError, subprocess.CalledProcessError)):
+            fast_package(source=flyte_project, output_dir=output_dir, options=options)
+
+    # The program is waited for, however the failure surfaced
+    mock_wait.assert_called_once()
+    assert os.listdir(output_dir) == []
+
+
+@pytest.mark.parametrize("compression", ["zst", "none"])
+def test_package_with_compression(flyte_project, tmp_path_factory, compression):
+    if compression == "zst":
+        zstandard = pytest.importorskip("zstandard")
+
+    options = FastPackageOptions(ignores=[], copy_style=CopyFileDetection.ALL, compression=compression)
+    archive_fname = fast_package(source=flyte_project, output_dir=tmp_path_factory.mktemp("out"), options=options)
+    assert str(archive_fname).endswith(FAST_FILEENDINGS[compression])
+
+    with open(archive_fname, "rb") as f:
+        fileobj = zstandard.ZstdDecompressor().stream_reader(f) if compression == "zst" else f
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            assert "src/workflows/hello_world.py" in tar.getnames()
+
+    # Extract the archive the same way it is done when a task is executed
+    dest = tmp_path_factory.mktemp("dest")
+    with patch("flytekit.tools.fast_registration.FlyteContextManager") as mock_context_manager:
+        mock_context_manager.current_context.return_value.file_access.get_data.side_effect = (
+            lambda src, dst: shutil.copy(src, dst)
+        )
+        download_distribution(archive_fname, str(dest))
+    assert (dest / "src" / "workflows" / "hello_world.py").read_text() == "print('Hello World!')"
+
+
+@pytest.mark.parametrize("compress_program", [None, "gzip"])
+def test_package_with_sendfile(flyte_project, tmp_path_factory, compress_program):
+    if compress_program == "gzip" and shutil.which("gzip") is None:
+        pytest.skip("gzip is not installed")
+
+    # Only files of at least TAR_BUFSIZE bytes are sent, smaller ones are copied by tarfile
+    (flyte_project / "src" / "large.bin").write_bytes(os.urandom(fast_registration.TAR_BUFSIZE + 1))
+    options = FastPackageOptions(
+        ignores=[],
+        copy_style=CopyFileDetection.ALL,
+        compress_program=compress_program,
+        compression="gz" if compress_program else "none",
+    )
+    with patch("flytekit.tools.fast_registration._sendfile", wraps=fast_registration._sendfile) as mock_sendfile:
+        archive_fname = fast_package(source=flyte_project, output_dir=tmp_path_factory.mktemp("out"), options=options)
+    mock_sendfile.assert_called_once()
+    with patch("flytekit.tools.fast_registration._USE_SENDFILE", False):
+        expected_fname = fast_package(source=flyte_project, output_dir=tmp_path_factory.mktemp("out"), options=options)
+
+    # Sending file contents to the file descriptor produces the same archive as writing them through tarfile
+    assert Path(archive_fname).read_bytes() == Path(expected_fname).read_bytes()
+
+
+@pytest.mark.parametrize(
+    "compress_program, compression",
+    [(None, "gz"), ("gzip", "gz"), (None, "none")],
+)
+def test_package_with_sink(flyte_project, tmp_path, compress_program, compression):
+    if compress_program == "gzip" and shutil.which("gzip") is None:
+        pytest.skip("gzip is not installed")
+
+    chunks = []
+    options = FastPackageOptions(
+        ignores=[], copy_style=CopyFileDetection.ALL, compress_program=compress_program, compression=compression
+    )
+    with patch("flytekit.tools.fast_registration.SINK_CHUNK_SIZE", 100):
+        archive_fname = fast_package(source=flyte_project, output_dir=tmp_path, options=options, sink=chunks.append)
+
+    assert all(len(chunk) == 100 for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= 100
+    assert b"".join(chunks) == Path(archive_fname).read_bytes()
+
+
+@pytest.mark.parametrize("copy_style", [None, CopyFileDetection.ALL])
+def test_package_failure_leaves_no_archive(flyte_project, tmp_path_factory, copy_style):
+    output_dir = tmp_path_factory.mktemp("out")
+    options = FastPackageOptions(ignores=[], copy_style=copy_style)
+    with patch("flytekit.tools.fast_registration.tar_strip_file_attributes", side_effect=OSError("disk full")):
+        with pytest.raises(OSError, match="disk full"):
+            fast_package(source=flyte_project, output_dir=output_dir, options=options)
+
+    # Neither a truncated archive nor its temporary file are left behind
+    assert os.listdir(output_dir) == []
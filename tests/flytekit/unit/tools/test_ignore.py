@@ -8,18 +8,37 @@ from unittest.mock import patch
 import pytest
 from docker.utils.build import PatternMatcher
 
-from flytekit.tools.ignore import DockerIgnore, GitIgnore, IgnoreGroup, StandardIgnore, FlyteIgnore
+from flytekit.tools.ignore import (
+    CompiledPatternMatcher,
+    DockerIgnore,
+    FlyteIgnore,
+    GitIgnore,
+    Ignore,
+    IgnoreGroup,
+    StandardIgnore,
+)
+from flytekit.tools.script_mode import list_all_files
 
 
 def make_tree(root: Path, tree: Dict):
+    # Write files of this directory first, with raw syscalls instead of file objects to keep test setup fast
+    for name, content in tree.items():
+        if not isinstance(content, str):
+            continue
+        if not content:
+            (root / name).touch()
+            continue
+        fd = os.open(root / name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, content.encode())
+        finally:
+            os.close(fd)
+
     for name, content in tree.items():
         if isinstance(content, dict):
             directory = root / name
             directory.mkdir()
             make_tree(directory, content)
-        if isinstance(content, str):
-            file = root / name
-            file.write_text(content)
 
 
 @pytest.fixture
@@ -177,6 +196,37 @@ def test_patternmatcher():
     assert pm.matches("sub/stuff.txt")
 
 
+@pytest.mark.parametrize(
+    "patterns",
+    [
+        ["*.foo", "!keep.foo", "sub"],
+        ["sub/*", "!sub/keep", "**/*.bar", "!**/keep.bar", "DATA"],
+        ["a/b", "*/c/**", "!a/b/keep"],
+        [],
+    ],
+)
+def test_compiled_patternmatcher(patterns):
+    """Test that CompiledPatternMatcher matches the same paths as PatternMatcher"""
+    pm = PatternMatcher(patterns)
+    compiled_pm = CompiledPatternMatcher(patterns)
+    paths = [
+        "whatever.foo",
+        "keep.foo",
+        "sub",
+        "sub/keep",
+        "sub/stuff.txt",
+        "sub/deeper/some.bar",
+        "x/keep.bar",
+        "data/large.file",
+        "a/b/keep",
+        "a/b/c/d",
+        "x/c/y",
+        ".dockerignore",
+    ]
+    for path in paths:
+        assert compiled_pm.matches(path) == pm.matches(path), path
+
+
 def test_simple_dockerignore(simple_dockerignore):
     dockerignore = DockerIgnore(simple_dockerignore)
     assert dockerignore.is_ignored(str(simple_dockerignore / "test.foo"))
@@ -210,6 +260,17 @@ def test_standard_ignore():
     assert ignore.is_ignored("__pycache__")
     assert ignore.is_ignored("foo/__pycache__")
     assert ignore.is_ignored("spam/ham/some.foo")
+    # Patterns without wildcards match exact paths only
+    assert not ignore.is_ignored("foo/.cache")
+    assert not ignore.is_ignored(".cache.py")
+
+
+def test_standard_ignore_literal_patterns():
+    ignore = StandardIgnore(root=".", patterns=["build", "dist/out"])
+    assert ignore.is_ignored("build")
+    assert ignore.is_ignored("dist/out")
+    assert not ignore.is_ignored("build.py")
+    assert not ignore.is_ignored("dist")
 
 
 def test_all_ignore(all_ignore):
@@ -249,6 +310,89 @@ def test_all_ignore_tar_filter(all_ignore):
     assert not ignore.tar_filter(TarInfo(name=".git"))
 
 
+def test_all_ignore_dir_contents(all_ignore):
+    """Test which directories do not need to be walked with all ignores grouped together"""
+    ignore = IgnoreGroup(all_ignore, [GitIgnore, DockerIgnore, StandardIgnore])
+    assert not ignore.ignores_dir_contents("sub")
+    assert ignore.ignores_dir_contents("sub/__pycache__")
+    assert ignore.ignores_dir_contents("data")
+    assert ignore.ignores_dir_contents(str(all_ignore / "data"))
+    assert ignore.ignores_dir_contents(".cache")
+    assert ignore.ignores_dir_contents(".git")
+
+
+def test_dockerignore_dir_contents_with_exclusion(tmp_path):
+    """Test that directories with files that are excluded from being ignored are walked"""
+    make_tree(tmp_path, {".dockerignore": "\n".join(["data", "!data/keep", "sub"])})
+    dockerignore = DockerIgnore(tmp_path)
+    assert dockerignore.is_ignored("data")
+    assert not dockerignore.ignores_dir_contents("data")
+    assert dockerignore.ignores_dir_contents("sub")
+
+
+@pytest.mark.parametrize(
+    "exclusion, prune_sub",
+    [("!**/keep.py", False), ("!*/keep.py", True), ("!data/*/keep.py", False), ("!data", False)],
+)
+def test_dockerignore_dir_contents_with_wildcard_exclusion(tmp_path, exclusion, prune_sub):
+    """Test that exclusion patterns with wildcards that may match files in ignored directories prevent pruning"""
+    make_tree(tmp_path, {".dockerignore": "\n".join(["data", exclusion])})
+    dockerignore = DockerIgnore(tmp_path)
+    assert not dockerignore.ignores_dir_contents("data")
+    assert dockerignore.ignores_dir_contents("data/sub") == prune_sub
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [["**/b"], ["a/**/b"], ["b"], ["*/b", "!x/b/keep.py"], ["a/*"]],
+)
+def test_compiled_patternmatcher_dir_contents(patterns):
+    """Test that all paths below directories whose contents are matched are matched by PatternMatcher as well"""
+    pm = PatternMatcher(patterns)
+    compiled_pm = CompiledPatternMatcher(patterns)
+    dirs = ["b", "x/b", "x/a/b", "a/b", "a/x/b", "a/x/y/b", "a/x"]
+    pruned = [dirpath for dirpath in dirs if compiled_pm.matches_dir_contents(dirpath)]
+    assert pruned
+    for dirpath in pruned:
+        for path in ["c.py", "keep.py", "d/e.py"]:
+            assert pm.matches(f"{dirpath}/{path}"), f"{dirpath}/{path}"
+
+
+def test_list_all_files_with_double_star_pattern(tmp_path):
+    make_tree(tmp_path, {".dockerignore": "**/b", "x": {"a": {"b": {"c.py": ""}}, "b": {"c.py": ""}}})
+    ignore = IgnoreGroup(str(tmp_path), [DockerIgnore])
+    assert not ignore.ignores_dir_contents("x/a/b")
+    files = list_all_files(str(tmp_path), False, ignore)
+    assert sorted(os.path.relpath(f, tmp_path) for f in files) == [".dockerignore", "x/a/b/c.py"]
+
+
+def test_list_all_files_with_wildcard_exclusion(tmp_path):
+    make_tree(
+        tmp_path,
+        {
+            ".dockerignore": "\n".join(["data", "!**/keep.py"]),
+            "data": {"keep.py": "", "sub": {"keep.py": "", "drop.py": ""}},
+        },
+    )
+    ignore = IgnoreGroup(str(tmp_path), [DockerIgnore])
+    files = list_all_files(str(tmp_path), False, ignore)
+    assert sorted(os.path.relpath(f, tmp_path) for f in files) == [".dockerignore", "data/keep.py", "data/sub/keep.py"]
+
+
+def test_custom_ignore_dir_contents(tmp_path):
+    """Test that custom ignores do not prune directories, even if they ignore them"""
+
+    class OnlyPy(Ignore):
+        def _is_ignored(self, path: str) -> bool:
+            return not path.endswith(".py")
+
+    make_tree(tmp_path, {"src": {"a.py": "", "b.txt": ""}})
+    ignore = IgnoreGroup(str(tmp_path), [OnlyPy])
+    assert ignore.is_ignored("src")
+    assert not ignore.ignores_dir_contents("src")
+    assert list_all_files(str(tmp_path), False, ignore) == [str(tmp_path / "src" / "a.py")]
+
+
 def test_flyteignore_parse(simple_flyteignore):
     """Test .flyteignore file parsing"""
     flyteignore = FlyteIgnore(simple_flyteignore)
@@ -11,6 +11,8 @@ import pytest
 
 import flytekit
 from flytekit.core.tracker import import_module_from_file
+from flytekit.tools._paths import _relative_path
+from flytekit.tools.ignore import Ignore, IgnoreGroup
 from flytekit.tools.script_mode import compress_scripts, hash_file, add_imported_modules_from_source, get_all_modules, \
     list_all_files
 from flytekit.tools.script_mode import (
@@ -336,3 +338,47 @@ def test_list_all_files_skip_socket_files():
     # Ensure that the regular file is the only file in the list
     assert len(files) == 1
     assert str(file1) in files
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="FIFOs do not exist on windows")
+def test_list_all_files_skip_fifo_and_broken_symlink(tmp_path):
+    file1 = tmp_path / "file1.py"
+    file1.write_text("")
+    os.mkfifo(tmp_path / "test.fifo")
+    os.symlink(tmp_path / "missing.py", tmp_path / "broken.py")
+    os.symlink(file1, tmp_path / "link.py")
+
+    files = list_all_files(os.fspath(tmp_path), False)
+    assert files == [str(file1), str(tmp_path / "link.py")]
+
+
+@pytest.mark.parametrize(
+    "path, root, expected",
+    [
+        ("/root/src/file.py", "/root", "src/file.py"),
+        ("/root/src/file.py", "/root/", "src/file.py"),
+        ("./src/file.py", ".", "src/file.py"),
+        # Falls back to os.path.relpath for paths that do not start with root
+        ("/root2/file.py", "/root", "../root2/file.py"),
+        ("/other/file.py", "/root", "../other/file.py"),
+    ],
+)
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses POSIX paths")
+def test_relative_path(path, root, expected):
+    assert _relative_path(path, root) == expected
+    assert _relative_path(path, root) == os.path.relpath(path, root)
+
+
+def test_list_all_files_does_not_stat_ignored_files(tmp_path):
+    class TxtIgnore(Ignore):
+        def _is_ignored(self, path: str) -> bool:
+            return path.endswith(".txt")
+
+    (tmp_path / "file1.py").write_text("")
+    (tmp_path / "ignored.txt").write_text("")
+    ignore_group = IgnoreGroup(str(tmp_path), [TxtIgnore])
+
+    with patch("os.lstat", wraps=os.lstat) as mock_lstat:
+        files = list_all_files(os.fspath(tmp_path), False, ignore_group)
+    assert files == [str(tmp_path / "file1.py")]
+    assert str(tmp_path / "ignored.txt") not in [call.args[0] for call in mock_lstat.call_args_list]